@@ -1,10 +1,14 @@
 from typing import Optional, Union
+import sys
+import atexit
 import operator
 import functools
 import fire
 import random
 import pypeerassets as pa
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from prettyprinter import cpprint as pprint
 
 from pypeerassets.pautils import (amount_to_exponent,
@@ -15,21 +19,26 @@ from pypeerassets.pautils import (amount_to_exponent,
 from pypeerassets.transactions import NulldataScript
 from pypeerassets.__main__ import get_card_transfer
 
-from pacli.provider import provider
+from pacli.provider import provider, configured_provider, profile, cache
 from pacli.config import Settings
 from pacli.keystore import init_keystore
 from pacli.tui import print_deck_info, print_deck_list
-from pacli.tui import print_card_list
-from pacli.export import export_to_csv
+from pacli.tui import print_card_list, tstamp_to_iso
+from pacli.export import export_to_csv, export_to_sqlite
 from pacli.utils import (cointoolkit_verify,
                          signtx,
                          sendtx
                          )
 from pacli.coin import Coin
+from pacli.broadcast import BroadcastQueue
+from pacli.cache import fetch_transactions
+from pacli.cards import find_cards
+from pacli.sync import sync_watchlist
 from pacli.config import (write_default_config,
                           conf_file,
                           default_conf,
-                          write_settings)
+                          write_settings,
+                          watchlist)
 
 
 class Config:
@@ -47,7 +56,11 @@ class Config:
         if key not in default_conf.keys():
             raise({'error': 'Invalid setting key.'})
 
-        write_settings(key, value)
+        # fire parses comma separated values into tuples
+        if isinstance(value, (tuple, list)):
+            value = ','.join(str(i) for i in value)
+
+        write_settings(key, str(value))
 
 
 class Address:
@@ -199,6 +212,29 @@ class Deck:
         pprint(parse_deckspawn_metainfo(bytes.fromhex(script),
                                         Settings.deck_version))
 
+    def export_db(self, filename: str, *deckids: str) -> None:
+        '''append cards of <deckids> (or the watchlist) to sqlite database <filename>'''
+
+        if not deckids:
+            deckids = watchlist(Settings)
+
+        exported = {}
+
+        for deckid in deckids:
+            deck = pa.find_deck(provider, deckid, Settings.deck_version,
+                                Settings.production)
+
+            if not deck:
+                raise Exception({"error": "Deck {deckid} not found.".format(deckid=deckid)})
+
+            try:
+                exported[deckid] = export_to_sqlite(
+                    deck, find_cards(provider, deck), filename)
+            except pa.exceptions.EmptyP2THDirectory:
+                exported[deckid] = 0
+
+        pprint({'new_cards': exported})
+
     def issue_modes(self):
 
         im = tuple({mode.name: mode.value} for mode_name, mode in pa.protocol.IssueMode.__members__.items())
@@ -232,31 +268,46 @@ class Card:
             return deck
 
     @classmethod
-    def __list(self, deckid: str):
+    def __list(self, deckid: str) -> tuple:
+        '''deck and lazily evaluated valid cards on it'''
 
         deck = self.__find_deck(deckid)
 
-        try:
-            cards = pa.find_all_valid_cards(provider, deck)
-        except pa.exceptions.EmptyP2THDirectory as err:
-            return err
+        if not deck:
+            raise Exception({"error": "Deck {deckid} not found.".format(deckid=deckid)})
+
+        return deck, find_cards(provider, deck)
+
+    @classmethod
+    def __synced(self, deckid: str) -> Optional[dict]:
+        '''state of a watched deck as of the last `pacli sync`'''
 
-        return {'cards': list(cards),
-                'deck': deck}
+        if deckid in watchlist(Settings):
+            state = cache.get_state(deckid)
+            if state and 'number_of_decimals' in state and 'synced_at' in state:
+                return state
 
     @classmethod
     def list(self, deckid: str):
         '''list the valid cards on this deck'''
 
-        cards = self.__list(deckid)['cards']
+        deck, cards = self.__list(deckid)
 
-        print_card_list(cards)
+        print_card_list(cards, deck.id)
 
     def balances(self, deckid: str):
         '''list card balances on this deck'''
 
-        cards, deck = self.__list(deckid).values()
+        synced = self.__synced(deckid)
+        if synced:
+            pprint({'balances': {address: exponent_to_amount(i, synced['number_of_decimals'])
+                                 for address, i in synced['balances'].items()},
+                    'synced_at': tstamp_to_iso(synced['synced_at'])})
+            return
 
+        deck, cards = self.__list(deckid)
+
+        # DeckState replays cards in block order, so it holds the whole deck at once
         state = pa.protocol.DeckState(cards)
 
         balances = [exponent_to_amount(i, deck.number_of_decimals)
@@ -267,12 +318,90 @@ class Card:
     def checksum(self, deckid: str) -> bool:
         '''show deck card checksum'''
 
-        cards, deck = self.__list(deckid).values()
+        synced = self.__synced(deckid)
+        if synced:
+            pprint({'checksum': synced['checksum'],
+                    'synced_at': tstamp_to_iso(synced['synced_at'])})
+            return
+
+        deck, cards = self.__list(deckid)
 
         state = pa.protocol.DeckState(cards)
 
         pprint({'checksum': state.checksum})
 
+    def verify(self, deckid: str, providers: str='explorer,cryptoid') -> None:
+        '''compare deck state as seen by several providers, queried in parallel.
+           * providers - comma separated list of explorer, cryptoid, rpcnode
+        '''
+
+        if isinstance(providers, str):
+            providers = providers.split(',')
+
+        def fetch(name):
+
+            start = time.monotonic()
+
+            try:
+                _provider = configured_provider(Settings, name)
+                deck = pa.find_deck(_provider, deckid, Settings.deck_version,
+                                    Settings.production)
+                if not deck:
+                    raise Exception("Deck {deckid} not found.".format(deckid=deckid))
+                try:
+                    cards = list(find_cards(_provider, deck))
+                except pa.exceptions.EmptyP2THDirectory:
+                    cards = []
+            except Exception as err:
+                return {'error': str(err),
+                        'elapsed': round(time.monotonic() - start, 3)}
+
+            # providers list transactions in different order, DeckState sorts them so
+            cards.sort(key=lambda c: (c.blocknum, c.blockseq, c.cardseq))
+
+            return {'cards': cards,
+                    'checksum': pa.protocol.DeckState(cards).checksum,
+                    'elapsed': round(time.monotonic() - start, 3)}
+
+        with ThreadPoolExecutor(max_workers=len(providers)) as pool:
+            results = dict(zip(providers, pool.map(fetch, providers)))
+
+        def card_key(card):
+            return (card.txid, card.blocknum, card.blockseq, card.cardseq,
+                    card.sender, card.receiver, card.amount)
+
+        failed = [name for name in providers if 'error' in results[name]]
+        compared = [name for name in providers if name not in failed]
+        diverging = None
+
+        for name in compared[1:]:
+            reference, cards = results[compared[0]]['cards'], results[name]['cards']
+            for n in range(max(len(reference), len(cards))):
+                a = card_key(reference[n]) if n < len(reference) else None
+                b = card_key(cards[n]) if n < len(cards) else None
+                if a != b:
+                    if diverging is None or n < diverging['index']:
+                        card = reference[n] if a else cards[n]
+                        diverging = {'index': n,
+                                     'txid': card.txid,
+                                     'blocknum': card.blocknum,
+                                     'providers': (compared[0], name)}
+                    break
+
+        report = {}
+        for name, r in results.items():
+            if name in failed:
+                report[name] = {'error': r['error'], 'elapsed': r['elapsed']}
+            else:
+                report[name] = {'checksum': r['checksum'],
+                                'cards': len(r['cards']),
+                                'elapsed': r['elapsed']}
+
+        pprint({'providers': report,
+                'agree': diverging is None and not failed,
+                'failed': failed,
+                'diverging': diverging})
+
     @staticmethod
     def to_exponent(number_of_decimals, amount):
         '''convert float to exponent'''
@@ -388,11 +517,16 @@ class Card:
         return self.transfer(deckid=deckid, receiver=receiver, amount=amount,
                              verify=verify, sign=sign, send=send)
 
-    def export(self, deckid: str, filename: str):
-        '''export cards to csv'''
+    def export(self, deckid: str, filename: str, format: str='csv'):
+        '''export cards to csv, or append them to sqlite database with --format sqlite'''
+
+        deck, cards = self.__list(deckid)
+
+        if format == 'sqlite':
+            pprint({'new_cards': export_to_sqlite(deck, cards, filename)})
+            return
 
-        cards = self.__list(deckid)['cards']
-        export_to_csv(cards=list(cards), filename=filename)
+        export_to_csv(cards=cards, filename=filename)
 
     def parse(self, deckid: str, cardid: str) -> None:
         '''parse card from txid and print data'''
@@ -406,12 +540,26 @@ class Card:
 
 class Transaction:
 
-    def raw(self, txid: str) -> None:
-        '''fetch raw tx and display it'''
+    def raw(self, *txids: str, file: str=None, fields: str=None,
+            workers: int=None) -> None:
+        '''fetch raw transactions and print them as JSON lines.
+           * txids - transaction ids, or use --file (- for stdin) with one txid per line
+           * fields - comma separated list of fields to keep, e.g. txid,vout
+        '''
+
+        txids = list(txids)
+
+        if file:
+            with (sys.stdin if file == '-' else open(file)) as f:
+                txids.extend(line.strip() for line in f if line.strip())
 
-        tx = provider.getrawtransaction(txid, 1)
+        if isinstance(fields, str):
+            fields = fields.split(',')
 
-        pprint(json.dumps(tx, indent=4))
+        for tx in fetch_transactions(provider, txids, workers, cache):
+            if fields and 'error' not in tx:
+                tx = {k: tx.get(k) for k in fields}
+            print(json.dumps(tx, separators=(',', ':')))
 
     def sendraw(self, rawtx: str) -> None:
         '''sendrawtransaction, returns the txid'''
@@ -420,18 +568,40 @@ class Transaction:
 
         pprint({'txid': txid})
 
+    def send_batch(self, filename: str, workers: int=4, rate: float=2,
+                   retries: int=5) -> None:
+        '''broadcast signed raw transactions from <filename>, one per line.
+           Progress is kept in <filename>.queue so interrupted runs can resume.'''
+
+        queue = BroadcastQueue(provider, filename + '.queue', workers=workers,
+                               rate=rate, retries=retries)
+        queue.load(filename)
+
+        pprint(queue.run())
+
+
+def sync(workers: int=None) -> None:
+    '''prefetch decks from the watchlist into local cache, suitable for cron'''
+
+    pprint(sync_watchlist(provider, cache, watchlist(Settings), Settings.deck_version,
+                          Settings.production, workers))
+
 
 def main():
 
     init_keystore()
 
+    if str(getattr(Settings, 'profile', False)).lower() == 'true':
+        atexit.register(lambda: print(json.dumps(profile()), file=sys.stderr))
+
     fire.Fire({
         'config': Config(),
         'deck': Deck(),
         'card': Card(),
         'address': Address(),
         'transaction': Transaction(),
-        'coin': Coin()
+        'coin': Coin(),
+        'sync': sync
         })
 
 
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from pypeerassets.networks import net_query
+from pypeerassets.transactions import Transaction
+
+
+class TokenBucket:
+
+    '''token bucket rate limiter, <rate> tokens per second up to <burst>'''
+
+    def __init__(self, rate: float, burst: int=1) -> None:
+
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        '''block until a token is available and take it'''
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.timestamp) * self.rate)
+                self.timestamp = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+
+
+def check_sent(response, txid: str) -> str:
+    '''raise unless sendrawtransaction <response> is the <txid> of the transaction,
+       local node returns errors as dicts and the explorer as text'''
+
+    if isinstance(response, dict):
+        response = response.get('result', response)
+
+    if not isinstance(response, str) or response.strip().strip('"') != txid:
+        raise Exception("transaction {txid} rejected: {response}".format(
+            txid=txid, response=response))
+
+    return txid
+
+
+class BroadcastQueue:
+
+    '''persistent queue of signed transactions waiting to be broadcast'''
+
+    def __init__(self, provider, queue_file: str, workers: int=4,
+                 rate: float=2, retries: int=5, backoff: float=1) -> None:
+
+        self.provider = provider
+        self.queue_file = queue_file
+        self.workers = workers
+        self.retries = max(1, retries)  # number of attempts, at least one
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, burst=workers)
+        self.order = []
+        self.entries = {}
+
+        if os.path.exists(queue_file):
+            with open(queue_file) as f:
+                state = json.load(f)
+            self.order = state['order']
+            self.entries = state['entries']
+
+            # failed transactions get another chance when resuming
+            for entry in self.entries.values():
+                if entry['status'] == 'failed':
+                    entry['status'] = 'pending'
+
+    def add(self, rawtx: str) -> str:
+        '''queue signed <rawtx>, returns it's txid'''
+
+        tx = Transaction.unhexlify(rawtx, network=net_query(self.provider.network))
+
+        if tx.txid not in self.entries:
+            self.order.append(tx.txid)
+            self.entries[tx.txid] = {'hex': rawtx,
+                                     'status': 'pending',
+                                     'attempts': 0,
+                                     'error': None,
+                                     'depends': sorted({i.txid for i in tx.ins})
+                                     }
+
+        return tx.txid
+
+    def load(self, filename: str) -> None:
+        '''queue raw transactions from <filename>, one per line'''
+
+        with open(filename) as f:
+            for line in f:
+                if line.strip():
+                    self.add(line.strip())
+
+        # only dependencies within the batch matter for ordering
+        for entry in self.entries.values():
+            entry['depends'] = [i for i in entry['depends'] if i in self.entries]
+
+        self.save()
+
+    def save(self) -> None:
+        '''atomically write the queue state to disk'''
+
+        tmp = self.queue_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'order': self.order, 'entries': self.entries}, f)
+
+        os.replace(tmp, self.queue_file)
+
+    def is_known(self, txid: str) -> bool:
+        '''check if provider already knows about this transaction'''
+
+        self.bucket.acquire()
+
+        try:
+            tx = self.provider.getrawtransaction(txid, 1)
+        except Exception:
+            return False
+
+        return isinstance(tx, dict) and tx.get('txid') == txid
+
+    def _broadcast(self, txid: str) -> tuple:
+        '''send single transaction, retrying with exponential backoff'''
+
+        if self.is_known(txid):
+            return ('known', 0, None)
+
+        error = None
+
+        for attempt in range(1, self.retries + 1):
+
+            self.bucket.acquire()
+
+            try:
+                check_sent(self.provider.sendrawtransaction(self.entries[txid]['hex']),
+                           txid)
+                return ('sent', attempt, None)
+            except Exception as err:
+                error = str(err)
+
+            if self.is_known(txid):
+                return ('known', attempt, None)
+
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        return ('failed', self.retries, error)
+
+    def _ready(self, running: set) -> list:
+        '''pending transactions with all dependencies accepted'''
+
+        # failures propagate to descendants regardless of their order in the file
+        changed = True
+        while changed:
+            changed = False
+            for entry in self.entries.values():
+                if entry['status'] == 'pending' and any(
+                        self.entries[i]['status'] == 'failed' for i in entry['depends']):
+                    entry.update(status='failed', error='dependency failed')
+                    changed = True
+
+        return [txid for txid in self.order
+                if self.entries[txid]['status'] == 'pending' and txid not in running
+                and all(self.entries[i]['status'] in ('sent', 'known')
+                        for i in self.entries[txid]['depends'])]
+
+    def run(self) -> dict:
+        '''broadcast everything in the queue, returns the report'''
+
+        start = time.monotonic()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+
+            while True:
+
+                for txid in self._ready(set(running.values())):
+                    running[pool.submit(self._broadcast, txid)] = txid
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    txid = running.pop(future)
+                    status, attempts, error = future.result()
+                    self.entries[txid].update(status=status, error=error,
+                                              attempts=self.entries[txid]['attempts'] + attempts)
+
+                self.save()
+
+        self.save()
+
+        return self.report(time.monotonic() - start)
+
+    def report(self, elapsed: float) -> dict:
+        '''per transaction status and throughput'''
+
+        transactions = [{'txid': txid,
+                         'status': self.entries[txid]['status'],
+                         'attempts': self.entries[txid]['attempts'],
+                         'error': self.entries[txid]['error']}
+                        for txid in self.order]
+
+        count = {}
+        for tx in transactions:
+            count[tx['status']] = count.get(tx['status'], 0) + 1
+
+        done = count.get('sent', 0) + count.get('known', 0)
+
+        return {'transactions': transactions,
+                'summary': count,
+                'elapsed': round(elapsed, 3),
+                'tx_per_second': round(done / elapsed, 3) if elapsed else None
+                }
@@ -0,0 +1,228 @@
+import functools
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from pypeerassets.provider import RpcNode
+
+from pacli.config import cache_file
+from pacli.scheduler import scheduler
+
+
+class TxCache:
+
+    '''Local on-disk cache of confirmed verbose (decoded) transactions and blocks,
+       and derived state of synced decks. Confirmations are recomputed from the
+       chain tip when <blockcount> is set.'''
+
+    version = 2
+    tip_ttl = 60  # seconds
+
+    def __init__(self, filename: str=cache_file) -> None:
+
+        self.lock = threading.Lock()
+        self.tip_lock = threading.Lock()
+        self.blockcount = None
+        self.tip_height, self.tip_time = None, 0.0
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            # earlier cache stored transactions without confirmations or height
+            self.db.execute('DROP TABLE IF EXISTS transactions')
+        if version < 2:
+            # P2TH listings are always fetched live now
+            self.db.execute('DROP TABLE IF EXISTS listings')
+        if version < self.version:
+            self.db.execute('PRAGMA user_version = {0}'.format(self.version))
+
+        self.db.execute('''CREATE TABLE IF NOT EXISTS transactions
+                           (txid TEXT PRIMARY KEY, height INTEGER NOT NULL, tx TEXT NOT NULL)''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS blocks
+                           (hash TEXT PRIMARY KEY, height INTEGER NOT NULL, block TEXT NOT NULL)''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS deck_state
+                           (deck_id TEXT PRIMARY KEY, state TEXT NOT NULL)''')
+        self.db.commit()
+
+    def tip(self) -> Optional[int]:
+        '''current block height, refreshed at most every tip_ttl seconds'''
+
+        if self.blockcount is None:
+            return None
+
+        with self.tip_lock:
+            if time.monotonic() - self.tip_time > self.tip_ttl:
+                try:
+                    self.tip_height = int(self.blockcount())
+                    self.tip_time = time.monotonic()
+                except Exception:
+                    pass  # keep serving with the last known tip, or stored confirmations
+
+            return self.tip_height
+
+    def _fetch(self, table: str, key: str, column: str) -> Optional[dict]:
+
+        with self.lock:
+            row = self.db.execute('SELECT height, {0} FROM {1} WHERE {2} = ?'.format(
+                column, table, 'txid' if table == 'transactions' else 'hash'),
+                (key,)).fetchone()
+
+        if not row:
+            return None
+
+        item = json.loads(row[1])
+        tip = self.tip()
+        if tip is not None:
+            item['confirmations'] = tip - row[0] + 1
+
+        return item
+
+    def get(self, txid: str) -> Optional[dict]:
+        '''return cached transaction or None'''
+
+        return self._fetch('transactions', txid, 'tx')
+
+    def put(self, tx: dict, height: int) -> None:
+        '''cache <tx> mined at <height>, only confirmed transactions are cached'''
+
+        if not tx.get('blockhash'):
+            return
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO transactions VALUES (?, ?, ?)',
+                            (tx['txid'], height, json.dumps(tx, separators=(',', ':'))))
+            self.db.commit()
+
+    def get_block(self, blockhash: str) -> Optional[dict]:
+
+        return self._fetch('blocks', blockhash, 'block')
+
+    def put_block(self, block: dict) -> None:
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)',
+                            (block['hash'], block['height'],
+                             json.dumps(block, separators=(',', ':'))))
+            self.db.commit()
+
+    def get_state(self, deck_id: str) -> Optional[dict]:
+        '''return last synced state of the deck or None'''
+
+        with self.lock:
+            row = self.db.execute('SELECT state FROM deck_state WHERE deck_id = ?',
+                                  (deck_id,)).fetchone()
+
+        if row:
+            return json.loads(row[0])
+
+    def put_state(self, deck_id: str, state: dict) -> None:
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO deck_state VALUES (?, ?)',
+                            (deck_id, json.dumps(state)))
+            self.db.commit()
+
+    def close(self) -> None:
+
+        self.db.close()
+
+
+def cache_reads(provider, cache: TxCache):
+    '''Serve verbose getrawtransaction and getblock calls of <provider> from <cache>.
+       Listings are left to the provider, so new cards show up while the
+       transactions they list come from the cache.
+       The instance is patched in place so isinstance checks still hold.'''
+
+    getrawtransaction = provider.getrawtransaction
+    getblock = provider.getblock
+
+    cache.blockcount = provider.getblockcount
+
+    @functools.wraps(getblock)
+    def cached_getblock(blockhash, *args):
+
+        block = cache.get_block(blockhash)
+        if block:
+            return block
+
+        block = getblock(blockhash, *args)
+        if isinstance(block, dict) and 'height' in block and 'hash' in block:
+            cache.put_block(block)
+
+        return block
+
+    @functools.wraps(getrawtransaction)
+    def cached_getrawtransaction(txid, verbose=0):
+
+        if not verbose:
+            return getrawtransaction(txid, verbose)
+
+        tx = cache.get(txid)
+        if tx:
+            return tx
+
+        tx = getrawtransaction(txid, verbose)
+        if isinstance(tx, dict) and tx.get('blockhash'):
+            cache.put(tx, cached_getblock(tx['blockhash'])['height'])
+
+        return tx
+
+    provider.getblock = cached_getblock
+    provider.getrawtransaction = cached_getrawtransaction
+
+    return provider
+
+
+def batch_transactions(provider, txids: list, cache: TxCache=None) -> list:
+    '''verbose transactions for <txids> from a single JSON-RPC batch call'''
+
+    found = {}
+    if cache:
+        found = {txid: cache.get(txid) for txid in txids}
+        found = {txid: tx for txid, tx in found.items() if tx}
+
+    missing = [txid for txid in txids if txid not in found]
+
+    if missing:
+        response = provider.batch([('getrawtransaction', [txid, 1]) for txid in missing])
+        # responses carry the index of the request as their id
+        for r in response:
+            if isinstance(r.get('result'), dict):
+                tx = found[missing[r['id']]] = r['result']
+                if cache and tx.get('blockhash'):
+                    cache.put(tx, provider.getblock(tx['blockhash'])['height'])
+
+    return [found.get(txid) or {'txid': txid, 'error': 'not found'} for txid in txids]
+
+
+def fetch_transactions(provider, txids: Iterable[str], workers: int=None,
+                       cache: TxCache=None, batch: int=500) -> Iterator[dict]:
+    '''yield verbose transactions for <txids> in order. Local node gets <batch>
+       txids per JSON-RPC batch call, other providers are queried concurrently
+       within the scheduler's limits.'''
+
+    if isinstance(provider, RpcNode):
+        txids = iter(txids)
+        while True:
+            chunk = list(itertools.islice(txids, batch))
+            if not chunk:
+                break
+            yield from batch_transactions(provider, chunk, cache)
+        return
+
+    def fetch(txid):
+
+        try:
+            tx = provider.getrawtransaction(txid, 1)
+        except Exception as err:
+            return {'txid': txid, 'error': str(err)}
+
+        if not isinstance(tx, dict):
+            return {'txid': txid, 'error': str(tx)}
+
+        return tx
+
+    yield from scheduler.map(fetch, txids, workers)
@@ -0,0 +1,78 @@
+from typing import Iterable, Iterator
+
+from pypeerassets import Deck
+from pypeerassets.__main__ import card_bundler, find_card_bundles
+from pypeerassets.exceptions import EmptyP2THDirectory
+from pypeerassets.pautils import (amount_to_exponent,
+                                  exponent_to_amount,
+                                  card_bundle_parser
+                                  )
+from pypeerassets.protocol import IssueMode
+from pypeerassets.provider import RpcNode
+
+from pacli.scheduler import scheduler
+
+
+def fetch_cards(provider, deck: Deck) -> Iterator[list]:
+    '''fetch and decode card bundles of <deck>, yields list of cards per transaction'''
+
+    if isinstance(provider, RpcNode):  # pypeerassets gets these in one batch call
+        for bundle in find_card_bundles(provider, deck):
+            yield list(card_bundle_parser(bundle))
+        return
+
+    txids = provider.listtransactions(deck.p2th_address)
+
+    if txids is None:
+        raise EmptyP2THDirectory({'error': 'No cards found on this deck.'})
+
+    def fetch(txid):
+        bundle = card_bundler(provider, deck, provider.getrawtransaction(txid, 1))
+        return list(card_bundle_parser(bundle))
+
+    yield from scheduler.map(fetch, txids)
+
+
+def validate_cards(issue_mode: int, cards: Iterable) -> Iterator:
+    '''Streaming equivalent of pypeerassets' validate_card_issue_modes.
+       None of the issue mode parsers needs to see the whole deck: ONCE keeps
+       the first CardIssue in listing order, which is what it sees first here.'''
+
+    if not issue_mode & 63:  # NONE, or no supported issue mode
+        return
+
+    modes = set()
+    for i in [1 << x for x in range(len(IssueMode))]:
+        if i & issue_mode:
+            try:
+                modes.add(IssueMode(i).name)
+            except ValueError:
+                continue
+
+    first_issue = None
+
+    for card in cards:
+
+        if 'ONCE' in modes and card.type == 'CardIssue':
+            if first_issue is None:
+                first_issue = card
+            else:
+                continue
+
+        if 'MONO' in modes:
+            card.amount = [amount_to_exponent(
+                exponent_to_amount(card.amount[0], card.number_of_decimals),
+                card.number_of_decimals)]
+
+        if 'UNFLUSHABLE' in modes and card.type != 'CardIssue':
+            continue
+
+        yield card
+
+
+def find_cards(provider, deck: Deck) -> Iterator:
+    '''lazy fetch -> decode -> validate pipeline of valid cards on <deck>'''
+
+    cards = (card for bundle in fetch_cards(provider, deck) for card in bundle)
+
+    return validate_cards(deck.issue_mode, cards)
@@ -1,5 +1,7 @@
-from decimal import Decimal
-from typing import Union
+import csv
+import itertools
+from decimal import Decimal, InvalidOperation
+from typing import Iterator
 
 from pypeerassets.exceptions import RecieverAmountMismatch
 from pypeerassets.networks import net_query
@@ -12,50 +14,101 @@ from pypeerassets.transactions import (tx_output,
 from pacli.provider import provider
 from pacli.config import Settings
 from pacli.utils import sign_transaction, sendtx
+from pacli.coinselect import exact, spendable, select_coins, naive, tx_size, tx_fee
 
 
-class Coin:
-
-    def sendto(self, address: Union[str], amount: Union[float],
-               locktime: int=0) -> str:
-        '''send coins to address'''
-
-        if not len(address) == amount:
-            raise RecieverAmountMismatch
-
-        network_params = net_query(Settings.network)
-
-        inputs = provider.select_inputs(Settings.key.address, sum(amount))
+def read_recipients(filename: str) -> Iterator[tuple]:
+    '''stream (address, amount) rows from csv <filename>, first line may be a header'''
 
-        outs = []
-
-        for addr, index, amount in zip(address, range(len(address)), amount):
-            outs.append(
-                tx_output(network=Settings.network, value=Decimal(amount),
-                          n=index,
-                          script=p2pkh_script(address=addr,
-                                              network=Settings.network))
-            )
-
-        #  first round of txn making is done by presuming minimal fee
-        change_sum = Decimal(inputs['total'] - network_params.min_tx_fee)
-
-        outs.append(
-            tx_output(network=provider.network,
-                      value=change_sum, n=len(outs)+1,
-                      script=p2pkh_script(address=Settings.key.address,
-                                          network=provider.network))
-            )
+    with open(filename) as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row:
+                continue
+            try:
+                yield row[0].strip(), Decimal(row[1].strip())
+            except (IndexError, InvalidOperation):
+                if reader.line_num == 1:
+                    continue
+                raise Exception({"error": "invalid row {n} in {file}: {row}".format(
+                    n=reader.line_num, file=filename, row=','.join(row))})
 
-        unsigned_tx = make_raw_transaction(network=provider.network,
-                                           inputs=inputs['utxos'],
-                                           outputs=outs,
-                                           locktime=Locktime(locktime)
-                                           )
 
-        signedtx = sign_transaction(provider, unsigned_tx, Settings.key)
+class Coin:
 
-        return sendtx(signedtx)
+    @exact
+    def sendto(self, address: list=None, amount: list=None, locktime: int=0,
+               file: str=None, max_outputs: int=500) -> dict:
+        '''send coins to addresses, given as lists or as csv <file> of address,amount rows.
+           Recipients are split into transactions of at most <max_outputs> outputs.'''
+
+        if file:
+            recipients = read_recipients(file)
+        else:
+            if not len(address) == len(amount):
+                raise RecieverAmountMismatch
+            recipients = zip(address, amount)
+
+        min_tx_fee = net_query(Settings.network).min_tx_fee
+
+        utxos = spendable(provider, Settings.key.address)
+        sent = []
+        saved = {'bytes': 0, 'fees': Decimal(0)}
+
+        report = {'transactions': sent}
+
+        while True:
+            try:
+                batch = list(itertools.islice(recipients, max_outputs))
+                if not batch:
+                    break
+
+                total = sum(Decimal(str(i[1])) for i in batch)
+                inputs, fee, change = select_coins(utxos, total, len(batch), min_tx_fee)
+
+                outs = [tx_output(network=provider.network, value=Decimal(str(amount)),
+                                  n=index,
+                                  script=p2pkh_script(address=addr,
+                                                      network=provider.network))
+                        for index, (addr, amount) in enumerate(batch)]
+
+                if change:
+                    outs.append(
+                        tx_output(network=provider.network,
+                                  value=change, n=len(outs),
+                                  script=p2pkh_script(address=Settings.key.address,
+                                                      network=provider.network))
+                        )
+
+                unsigned_tx = make_raw_transaction(network=provider.network,
+                                                   inputs=[i[1] for i in inputs],
+                                                   outputs=outs,
+                                                   locktime=Locktime(locktime)
+                                                   )
+
+                signedtx = sign_transaction(provider, unsigned_tx, Settings.key)
+                txid = sendtx(signedtx)
+            except Exception as err:
+                # report what went out, recipients past <sent_recipients> can be sent again
+                report['error'] = str(err) or type(err).__name__
+                break
+
+            size = tx_size(len(inputs), len(outs))
+            naive_size = tx_size(len(naive(utxos, total, min_tx_fee)), len(batch) + 1)
+            saved['bytes'] += naive_size - size
+            saved['fees'] += tx_fee(naive_size, min_tx_fee) - fee
+
+            sent.append({'txid': txid, 'recipients': len(batch), 'inputs': len(inputs),
+                         'outputs': len(outs), 'bytes': size, 'fee': str(fee)})
+
+            # change is unconfirmed yet, so spent inputs are simply dropped
+            utxos = [i for i in utxos if i not in inputs]
+
+        report.update({'sent_recipients': sum(i['recipients'] for i in sent),
+                       'bytes_saved': saved['bytes'],
+                       'fees_saved': str(saved['fees'])})
+
+        return report
 
     def opreturn(self, string: hex, locktime: int=0) -> str:
         '''send op_return transaction'''
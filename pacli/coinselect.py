@@ -0,0 +1,188 @@
+import functools
+from decimal import Decimal, ROUND_UP, localcontext
+
+from btcpy.structs.transaction import TxIn, MutableTxIn, Sequence, ScriptSig
+from pypeerassets.exceptions import InsufficientFunds
+
+# estimated sizes of P2PKH transaction parts, in bytes
+TX_OVERHEAD = 14  # version, timestamp, input and output counts, locktime
+INPUT_SIZE = 148
+OUTPUT_SIZE = 34
+
+
+def exact(fn):
+    '''run <fn> with enough precision for coin amounts,
+       pypeerassets sets the global decimal context to 6 digits'''
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+
+        with localcontext() as ctx:
+            ctx.prec = 28
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def tx_size(inputs: int, outputs: int) -> int:
+
+    return TX_OVERHEAD + INPUT_SIZE * inputs + OUTPUT_SIZE * outputs
+
+
+@exact
+def tx_fee(size: int, min_tx_fee: Decimal) -> Decimal:
+    '''fee for <size> bytes, <min_tx_fee> is charged per kB and is also the minimum'''
+
+    fee = (min_tx_fee * size / 1000).quantize(Decimal('0.000001'), rounding=ROUND_UP)
+
+    return max(min_tx_fee, fee)
+
+
+@exact
+def spendable(provider, address: str) -> list:
+    '''all (value, txin) UTXOs of <address>, in provider's order'''
+
+    try:
+        unspent = provider.listunspent(address)
+    except InsufficientFunds:  # explorer raises when there are none
+        return []
+
+    utxos = []
+
+    for utxo in unspent:
+        if 'txid' in utxo:  # local node
+            utxos.append((Decimal(str(utxo['amount'])),
+                          MutableTxIn(txid=utxo['txid'],
+                                      txout=utxo['vout'],
+                                      sequence=Sequence.max(),
+                                      script_sig=ScriptSig.empty())))
+        else:  # explorer and cryptoid, values in satoshis
+            utxos.append((Decimal(int(utxo['value'])) / 10**8,
+                          TxIn(txid=utxo['tx_hash'],
+                               txout=utxo['tx_ouput_n'],
+                               sequence=Sequence.max(),
+                               script_sig=ScriptSig.unhexlify(utxo['script']))))
+
+    return utxos
+
+
+@exact
+def branch_and_bound(utxos: list, target: Decimal, cost_of_change: Decimal,
+                     fee_per_input: Decimal, max_tries: int=100000) -> list:
+    '''Depth first search for a set of <utxos> whose effective value (value less
+       the fee to spend it) lands in [target, target + cost_of_change], so no
+       change output is needed. Prefers fewest inputs, then least waste.
+       Returns None if there is no such set or search gave up.'''
+
+    pool = sorted((u for u in utxos if u[0] > fee_per_input),
+                  key=lambda u: u[0], reverse=True)
+    values = [u[0] - fee_per_input for u in pool]
+
+    remaining = [Decimal(0)] * (len(values) + 1)  # sum of values from index on
+    for i in reversed(range(len(values))):
+        remaining[i] = remaining[i + 1] + values[i]
+
+    selection, total, i = [], Decimal(0), 0
+    best, best_waste = None, None
+
+    for _ in range(max_tries):
+
+        if total + remaining[i] < target or total > target + cost_of_change:
+            backtrack = True
+        elif total >= target:
+            waste = total - target
+            if best is None or (len(selection), waste) < (len(best), best_waste):
+                best, best_waste = list(selection), waste
+            backtrack = True
+        else:
+            backtrack = False
+
+        if backtrack:
+            if not selection:
+                break
+            # drop the last included utxo and explore the branch without it
+            i = selection.pop()
+            total -= values[i]
+            i += 1
+            continue
+
+        selection.append(i)
+        total += values[i]
+        i += 1
+
+    if best is not None:
+        return [pool[i] for i in best]
+
+
+@exact
+def largest_first(utxos: list, amount: Decimal, outputs: int,
+                  min_tx_fee: Decimal) -> list:
+    '''fewest inputs covering <amount> plus fee, with a change output'''
+
+    selected, total = [], Decimal(0)
+
+    for utxo in sorted(utxos, key=lambda u: u[0], reverse=True):
+        selected.append(utxo)
+        total += utxo[0]
+        if total >= amount + tx_fee(tx_size(len(selected), outputs + 1), min_tx_fee):
+            break
+    else:
+        raise InsufficientFunds
+
+    # drop the smallest inputs which are not needed after all
+    while len(selected) > 1:
+        rest = total - selected[-1][0]
+        if rest < amount + tx_fee(tx_size(len(selected) - 1, outputs + 1), min_tx_fee):
+            break
+        total = rest
+        selected.pop()
+
+    return selected
+
+
+@exact
+def naive(utxos: list, amount: Decimal, min_tx_fee: Decimal) -> list:
+    '''inputs in provider order until amount and flat minimal fee are covered'''
+
+    selected, total = [], Decimal(0)
+
+    for utxo in utxos:
+        if total >= amount + min_tx_fee:
+            break
+        selected.append(utxo)
+        total += utxo[0]
+
+    return selected
+
+
+@exact
+def select_coins(utxos: list, amount: Decimal, outputs: int,
+                 min_tx_fee: Decimal) -> tuple:
+    '''Select UTXOs paying <amount> to <outputs> recipients.
+       Returns (selected, fee, change), change is 0 when no change output is needed,
+       dust change is added to the fee.'''
+
+    rate = min_tx_fee / 1000
+
+    selected = branch_and_bound(utxos,
+                                target=amount + rate * tx_size(0, outputs),
+                                cost_of_change=rate * (OUTPUT_SIZE + INPUT_SIZE),
+                                fee_per_input=rate * INPUT_SIZE)
+
+    largest = largest_first(utxos, amount, outputs, min_tx_fee)
+
+    # changeless set only wins if it makes for a transaction no bigger
+    if selected and tx_size(len(selected), outputs) <= tx_size(len(largest), outputs + 1):
+        total = sum(u[0] for u in selected)
+        # minimal fee may be over what was budgeted for small transactions
+        if total - amount >= tx_fee(tx_size(len(selected), outputs), min_tx_fee):
+            return selected, total - amount, Decimal(0)
+
+    fee = tx_fee(tx_size(len(largest), outputs + 1), min_tx_fee)
+    change = sum(u[0] for u in largest) - amount - fee
+
+    # change worth less than the minimal fee would cost more to spend than it's worth
+    if change < min_tx_fee:
+        return largest, fee + change, Decimal(0)
+
+    return largest, fee, change
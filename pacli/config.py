@@ -11,6 +11,7 @@ from pypeerassets import Kutil
 conf_dir = user_config_dir("pacli")
 conf_file = os.path.join(conf_dir, "pacli.conf")
 logfile = os.path.join(conf_dir, "pacli.log")
+cache_file = os.path.join(conf_dir, "cache.db")
 
 
 def write_default_config(conf_file=None):
@@ -94,4 +95,10 @@ def write_settings(key: str, value: Union[str, bool]) -> None:
         config.write(configfile)
 
 
+def watchlist(settings) -> list:
+    '''deck ids on the watchlist'''
+
+    return [i.strip() for i in getattr(settings, 'watchlist', '').split(',') if i.strip()]
+
+
 Settings = load_conf()
@@ -5,5 +5,12 @@ default_conf = {
     "production": True,
     "deck_version": 1,  # deck version
     "change": "default",
-    "provider": "explorer"  # explorer, cryptoid
+    "provider": "explorer",  # explorer, cryptoid
+    "providers": "",  # comma separated, enables hedged requests across them
+    "hedge_delay": 0.5,  # seconds to wait on a provider before asking the next one
+    "profile": False,  # print provider limits and latencies to stderr on exit
+    "watchlist": "",  # comma separated deck ids, prefetched by `pacli sync`
+    "record": "",  # record provider calls into this trace file
+    "replay": "",  # serve provider calls from this trace file, offline
+    "replay_latency": False  # sleep through recorded latencies when replaying
     }
@@ -1,4 +1,7 @@
 import csv
+import itertools
+import sqlite3
+from contextlib import closing
 from pypeerassets.pautils import exponent_to_amount
 
 
@@ -17,6 +20,85 @@ def export_to_csv(cards, filename):
 
     with open(filename, 'w') as csv_file:
         writer = csv.writer(csv_file, delimiter=';')
-        writer.writerow(format_card(cards[0]).keys())  # writing the header
-        for i in cards:
-            writer.writerow(format_card(i).values())
+        for n, card in enumerate(cards):
+            c = format_card(card)
+            if not n:
+                writer.writerow(c.keys())  # writing the header
+            writer.writerow(c.values())
+
+
+schema = '''
+CREATE TABLE IF NOT EXISTS decks (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    issuer TEXT,
+    issue_mode INTEGER,
+    number_of_decimals INTEGER,
+    issue_time INTEGER
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    id INTEGER PRIMARY KEY,
+    address TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    txid TEXT NOT NULL,
+    cardseq INTEGER NOT NULL,
+    deck_id TEXT NOT NULL REFERENCES decks(id),
+    blocknum INTEGER,
+    blockseq INTEGER,
+    timestamp INTEGER,
+    sender INTEGER REFERENCES addresses(id),
+    receiver INTEGER REFERENCES addresses(id),
+    amount INTEGER,
+    type TEXT,
+    PRIMARY KEY (txid, cardseq)
+);
+CREATE INDEX IF NOT EXISTS cards_deck_id ON cards(deck_id);
+CREATE INDEX IF NOT EXISTS cards_sender ON cards(sender);
+CREATE INDEX IF NOT EXISTS cards_receiver ON cards(receiver);
+CREATE INDEX IF NOT EXISTS cards_blocknum ON cards(blocknum);
+'''
+
+
+def export_to_sqlite(deck, cards, filename, chunk=10000) -> int:
+    '''append <cards> of <deck> to sqlite database <file>, returns number of new cards.
+       amount is stored as integer, divide by 10 ** decks.number_of_decimals.'''
+
+    with closing(sqlite3.connect(filename)) as db:
+        db.executescript(schema)
+
+        with db:
+            db.execute('INSERT OR REPLACE INTO decks VALUES (?, ?, ?, ?, ?, ?)',
+                       (deck.id, deck.name, deck.issuer, deck.issue_mode,
+                        deck.number_of_decimals, deck.issue_time))
+
+        # cards below the last exported block are already there
+        last = db.execute('SELECT MAX(blocknum) FROM cards WHERE deck_id = ?',
+                          (deck.id,)).fetchone()[0] or 0
+        addresses = dict(db.execute('SELECT address, id FROM addresses'))
+        known, before = len(addresses), db.total_changes
+
+        def address_id(address):
+
+            if address not in addresses:
+                addresses[address] = db.execute('INSERT INTO addresses (address) VALUES (?)',
+                                                (address,)).lastrowid
+            return addresses[address]
+
+        cards = (c for c in cards if c.blocknum >= last)
+
+        while True:
+            batch = list(itertools.islice(cards, chunk))
+            if not batch:
+                break
+
+            with db:  # one transaction per chunk
+                rows = [(c.txid, c.cardseq, deck.id, c.blocknum, c.blockseq,
+                         c.timestamp, address_id(c.sender), address_id(c.receiver[0]),
+                         c.amount[0], c.type) for c in batch]
+                db.executemany('INSERT OR IGNORE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               rows)
+
+        new = db.total_changes - before - (len(addresses) - known)
+
+    return new
@@ -0,0 +1,151 @@
+import functools
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Backend:
+
+    '''a provider along with it's latency stats and circuit breaker state'''
+
+    def __init__(self, name: str, provider, max_failures: int=3,
+                 cooldown: float=60) -> None:
+
+        self.name = name
+        self.provider = provider
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.latencies = deque(maxlen=100)
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        '''closed circuit, or open one past it's cooldown (half-open)'''
+
+        return self.opened_at is None or time.monotonic() - self.opened_at > self.cooldown
+
+    def percentile(self, p: float) -> float:
+
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        if not latencies:
+            return 0.0
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    def success(self, latency: float) -> None:
+
+        with self.lock:
+            self.latencies.append(latency)
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self) -> None:
+
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+
+        return {'p50': round(self.percentile(0.5), 3),
+                'p99': round(self.percentile(0.99), 3),
+                'calls': len(self.latencies),
+                'failures': self.failures,
+                'available': self.available}
+
+
+class HedgedProvider:
+
+    '''Spreads read calls over several providers. The call goes to the fastest
+       available backend, and if it does not answer within <delay> seconds
+       (or fails) the same call is sent to the next one; first answer wins.
+       Anything else is served by the current primary.'''
+
+    read_calls = {'getrawtransaction', 'getbalance', 'listtransactions',
+                  'listunspent', 'getblock', 'getblockhash', 'getblockcount',
+                  'getdifficulty', 'getinfo', 'getaddress', 'getreceivedbyaddress',
+                  'select_inputs'}
+
+    def __init__(self, providers: dict, delay: float=0.5, max_failures: int=3,
+                 cooldown: float=60) -> None:
+
+        self.backends = [Backend(name, provider, max_failures, cooldown)
+                         for name, provider in providers.items()]
+        self.delay = delay
+
+    def ranked(self, method: str=None) -> list:
+        '''available backends implementing <method>, fastest first,
+           then those without any successful call'''
+
+        backends = [b for b in self.backends
+                    if method is None or hasattr(b.provider, method)]
+
+        if not backends:
+            raise AttributeError('no provider implements {0}'.format(method))
+
+        available = [b for b in backends if b.available] or backends
+
+        return sorted(available, key=lambda b: (not b.latencies, b.percentile(0.5)))
+
+    @property
+    def primary(self):
+
+        return self.ranked()[0].provider
+
+    def stats(self) -> dict:
+
+        return {b.name: b.stats() for b in self.backends}
+
+    def __getattr__(self, name: str):
+
+        if name in self.read_calls:
+            return functools.partial(self._hedged, name)
+
+        return getattr(self.ranked(name)[0].provider, name)
+
+    def _hedged(self, method: str, *args, **kwargs):
+
+        results = queue.Queue()
+
+        def call(backend):
+
+            start = time.monotonic()
+            try:
+                result = getattr(backend.provider, method)(*args, **kwargs)
+            except Exception as err:
+                backend.failure()
+                results.put((False, err))
+            else:
+                backend.success(time.monotonic() - start)
+                results.put((True, result))
+
+        backends = self.ranked(method)
+        pending = 0
+        error = None
+
+        while backends or pending:
+
+            if backends:
+                threading.Thread(target=call, args=(backends.pop(0),),
+                                 daemon=True).start()
+                pending += 1
+
+            try:
+                ok, result = results.get(timeout=self.delay if backends else None)
+            except queue.Empty:
+                continue  # primary is slow, hedge to the next backend
+
+            pending -= 1
+
+            if ok:
+                return result
+
+            error = result
+
+        raise error
@@ -1,6 +1,10 @@
 from pypeerassets.provider import RpcNode, Cryptoid, Explorer
 from pypeerassets import pautils
 from pacli.config import Settings
+from pacli.hedge import HedgedProvider
+from pacli.scheduler import scheduler
+from pacli.cache import TxCache, cache_reads
+from pacli.replay import record, replay
 
 
 def set_up(provider):
@@ -8,7 +12,7 @@ def set_up(provider):
 
     # if provider is local node, check if PA P2TH is loaded in local node
     # this handles indexing of transaction
-    if Settings.provider == "rpcnode":
+    if isinstance(provider, RpcNode):
         if Settings.production:
             if not provider.listtransactions("PAPROD"):
                 pautils.load_p2th_privkey_into_local_node(provider)
@@ -17,23 +21,26 @@ def set_up(provider):
                 pautils.load_p2th_privkey_into_local_node(provider, prod=False)
 
 
-def configured_provider(Settings):
-    " resolve settings into configured provider "
+def configured_provider(Settings, name: str=None):
+    " resolve settings into configured provider, <name> overrides Settings.provider "
 
-    if Settings.provider.lower() == "rpcnode":
+    name = (name or Settings.provider).lower()
+
+    if name == "rpcnode":
         _provider = RpcNode
 
-    elif Settings.provider.lower() == "cryptoid":
+    elif name == "cryptoid":
         _provider = Cryptoid
 
-    elif Settings.provider.lower() == "explorer":
+    elif name == "explorer":
         _provider = Explorer
 
     else:
         raise Exception('invalid provider.')
 
-    if Settings.provider.lower() != "rpcnode":
-        provider = _provider(network=Settings.network)
+    if name != "rpcnode":
+        # public explorers throttle, keep within their limits
+        provider = scheduler.wrap(_provider(network=Settings.network))
     else:
         provider = _provider(testnet=Settings.testnet, username=Settings.rpcuser, password=Settings.rpcpassword, ip=None, port=Settings.rpcport, directory=None)
     set_up(provider)
@@ -41,4 +48,47 @@ def configured_provider(Settings):
     return provider
 
 
-provider = configured_provider(Settings)
+def hedged_provider(Settings):
+    " resolve comma separated Settings.providers into a HedgedProvider "
+
+    names = [i.strip().lower() for i in Settings.providers.split(',') if i.strip()]
+
+    # local node takes accounts rather than addresses and answers in it's own format
+    if 'rpcnode' in names:
+        raise Exception({"error": "rpcnode can not be used in providers, only explorer and cryptoid."})
+
+    return HedgedProvider({name: configured_provider(Settings, name) for name in names},
+                          delay=float(getattr(Settings, 'hedge_delay', 0.5)))
+
+
+# a trace is recorded and replayed against an empty cache of it's own,
+# so it holds what the network answered whatever the local cache.db has
+if getattr(Settings, 'replay', None) or getattr(Settings, 'record', None):
+    cache = TxCache(':memory:')
+else:
+    cache = TxCache()
+
+if getattr(Settings, 'replay', None):
+    provider = replay(Settings.replay,
+                      latency=str(getattr(Settings, 'replay_latency', False)).lower() == 'true')
+else:
+    if getattr(Settings, 'providers', None):
+        provider = hedged_provider(Settings)
+    else:
+        provider = configured_provider(Settings)
+
+    if getattr(Settings, 'record', None):
+        provider = record(provider, Settings.record)
+
+provider = cache_reads(provider, cache)
+
+
+def profile() -> dict:
+    " current provider scheduling limits and latency stats "
+
+    stats = {'scheduler': scheduler.stats()}
+
+    if isinstance(provider, HedgedProvider):
+        stats['providers'] = provider.stats()
+
+    return stats
@@ -0,0 +1,153 @@
+import atexit
+import functools
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from decimal import Decimal
+
+from pypeerassets import exceptions
+from pypeerassets.provider import RpcNode, Cryptoid, Explorer
+from pypeerassets.provider.common import Provider
+
+# provider attributes a trace may carry, never credentials or urls
+ATTRIBUTES = ('net', 'testnet')
+
+
+def call_key(method: str, args: tuple, kwargs: dict) -> tuple:
+
+    return (method, repr(args), repr(sorted(kwargs.items())))
+
+
+def encode(obj):
+
+    if isinstance(obj, Decimal):
+        return {'__decimal__': str(obj)}
+
+    raise TypeError('{0} is not JSON serializable'.format(type(obj).__name__))
+
+
+def decode(obj: dict):
+
+    if '__decimal__' in obj:
+        return Decimal(obj['__decimal__'])
+
+    return obj
+
+
+def error_type(name: str) -> type:
+    '''pypeerassets exception class by <name>, or Exception'''
+
+    cls = getattr(exceptions, name, None)
+
+    return cls if isinstance(cls, type) and issubclass(cls, Exception) else Exception
+
+
+def public_methods(provider) -> set:
+
+    names = set(dir(type(provider))) | set(getattr(provider, 'read_calls', ()))
+
+    return {name for name in names
+            if not name.startswith('_') and callable(getattr(provider, name, None))}
+
+
+def record(provider, filename: str):
+    '''Record every public method call of <provider>: arguments, response
+       (or exception) and latency go to gzip compressed JSON lines trace <filename>.
+       Calls the provider makes to itself are not recorded, only the outermost one,
+       neither are calls answering with something that is not JSON (signed inputs).
+       The instance is patched in place so isinstance checks still hold.'''
+
+    trace = gzip.open(filename, 'wt')
+    lock = threading.Lock()
+    local = threading.local()
+    # network is derived from net, HedgedProvider serves it from it's primary backend
+    attributes = {k: getattr(provider, k) for k in ATTRIBUTES if hasattr(provider, k)}
+
+    trace.write(json.dumps({'class': type(provider).__name__,
+                            'attributes': attributes}) + '\n')
+    atexit.register(trace.close)
+
+    def recorded(method, fn, *args, **kwargs):
+
+        if getattr(local, 'active', False):
+            return fn(*args, **kwargs)
+
+        local.active = True
+        start = time.monotonic()
+        response, error = None, None
+
+        try:
+            response = fn(*args, **kwargs)
+            return response
+        except Exception as err:
+            error = {'type': type(err).__name__, 'message': str(err)}
+            raise
+        finally:
+            local.active = False
+            try:
+                entry = json.dumps([call_key(method, args, kwargs), response, error,
+                                    time.monotonic() - start], default=encode)
+            except TypeError:
+                entry = None
+            if entry:
+                with lock:
+                    trace.write(entry + '\n')
+
+    for name in public_methods(provider):
+        setattr(provider, name,
+                functools.partial(recorded, name, getattr(provider, name)))
+
+    return provider
+
+
+def replay(filename: str, latency: bool=False):
+    '''Provider answering from trace <filename> written by record, with no
+       network access. Calls are served in recorded order per distinct call,
+       with <latency> the recorded latency is slept through as well.'''
+
+    calls = defaultdict(deque)
+
+    with gzip.open(filename, 'rt') as trace:
+        header = json.loads(next(trace))
+        for line in trace:
+            key, response, error, elapsed = json.loads(line, object_hook=decode)
+            calls[tuple(key)].append((response, error, elapsed))
+
+    # HedgedProvider is replayed as a plain Provider on the recorded network
+    base = {cls.__name__: cls for cls in (RpcNode, Cryptoid, Explorer)}.get(
+        header['class'], Provider)
+
+    # instance of the recorded class, without calling it's __init__
+    cls = type('Replay' + base.__name__, (base,), {})
+    cls.__abstractmethods__ = frozenset()  # served from the trace instead
+    provider = cls.__new__(cls)
+    provider.__dict__.update({k: v for k, v in header['attributes'].items()
+                              if k in ATTRIBUTES})
+
+    lock = threading.Lock()
+
+    def replayed(method, *args, **kwargs):
+
+        key = call_key(method, args, kwargs)
+
+        with lock:
+            if key not in calls:
+                raise Exception({'error': 'call not recorded: {0}{1}'.format(method, key[1])})
+            # last answer is repeated if the call is made more often than recorded
+            response, error, elapsed = (calls[key].popleft() if len(calls[key]) > 1
+                                        else calls[key][0])
+
+        if latency:
+            time.sleep(elapsed)
+
+        if error is not None:
+            raise error_type(error['type'])(error['message'])
+
+        return response
+
+    for method in {key[0] for key in calls} | public_methods(provider):
+        setattr(provider, method, functools.partial(replayed, method))
+
+    return provider
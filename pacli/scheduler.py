@@ -0,0 +1,195 @@
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+from urllib.parse import urlparse
+
+from pypeerassets.provider import Explorer
+
+
+def throttle_info(err: Exception) -> tuple:
+    '''(throttled, retry_after) from HTTP error raised by a provider'''
+
+    response = getattr(err, 'response', None)  # requests.HTTPError
+    code = getattr(err, 'code', None) or getattr(response, 'status_code', None)
+    headers = getattr(err, 'headers', None) or getattr(response, 'headers', None) or {}
+
+    throttled = code in (429, 503) or 'Too Many Requests' in str(err)
+
+    try:
+        retry_after = float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        retry_after = None
+
+    return throttled, retry_after
+
+
+class HostLimit:
+
+    '''AIMD concurrency limit for a single host'''
+
+    def __init__(self, limit: float=4, max_limit: float=32) -> None:
+
+        self.limit = float(limit)
+        self.max_limit = max_limit
+        self.active = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> None:
+
+        with self.cond:
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait <= 0 and self.active < int(self.limit):
+                    self.active += 1
+                    return
+                self.cond.wait(wait if wait > 0 else None)
+
+    def release(self, ok: bool=True, retry_after: float=None) -> None:
+
+        with self.cond:
+            self.active -= 1
+
+            if ok:  # additive increase, about +1 per limit's worth of calls
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:  # multiplicative decrease
+                self.limit = max(1.0, self.limit / 2)
+
+            if retry_after:
+                self.throttled += 1
+                self.blocked_until = max(self.blocked_until,
+                                         time.monotonic() + retry_after)
+
+            self.cond.notify_all()
+
+    def stats(self) -> dict:
+
+        return {'limit': round(self.limit, 2),
+                'active': self.active,
+                'throttled': self.throttled,
+                'blocked_for': round(max(0, self.blocked_until - time.monotonic()), 2)}
+
+
+class Scheduler:
+
+    '''keeps a separate AIMD budget per host and runs provider calls through it'''
+
+    def __init__(self, limit: float=4, max_limit: float=32, retries: int=5,
+                 backoff: float=1) -> None:
+
+        self.limit = limit
+        self.max_limit = max_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def host_limit(self, host: str) -> HostLimit:
+
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostLimit(self.limit, self.max_limit)
+
+            return self.hosts[host]
+
+    def call(self, host: str, fn, *args, **kwargs):
+        '''run <fn> within <host>'s budget, retrying when throttled'''
+
+        # provider methods call each other, only the outermost call takes a slot
+        if getattr(self.local, 'host', None):
+            return fn(*args, **kwargs)
+
+        limit = self.host_limit(host)
+
+        for attempt in range(self.retries + 1):
+
+            limit.acquire()
+            self.local.host = host
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as err:
+                throttled, retry_after = throttle_info(err)
+
+                if throttled:
+                    retry_after = retry_after or self.backoff * 2 ** attempt
+
+                limit.release(ok=False, retry_after=retry_after)
+
+                if not throttled or attempt == self.retries:
+                    raise
+            else:
+                limit.release()
+                return result
+            finally:
+                self.local.host = None
+
+    def wrap(self, provider):
+        '''route public method calls of <provider> through the scheduler,
+           the instance is patched in place so isinstance checks still hold.'''
+
+        for name in dir(type(provider)):
+            if name.startswith('_'):
+                continue
+            method = getattr(provider, name)
+            if callable(method):
+                setattr(provider, name,
+                        functools.partial(self.call, call_host(provider, name), method))
+
+        return provider
+
+    @property
+    def max_workers(self) -> int:
+
+        return int(self.max_limit)
+
+    def map(self, fn, iterable: Iterable, workers: int=None) -> Iterator:
+        '''Lazy, ordered map of <fn> over <iterable> in a thread pool. By default
+           the pool is as large as any host's limit can grow, so the per host
+           limits are what bounds concurrency rather than the pool size.'''
+
+        workers = workers or self.max_workers
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for item in iterable:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def stats(self) -> dict:
+
+        return {host: limit.stats() for host, limit in self.hosts.items()}
+
+
+def explorer_host(provider) -> str:
+
+    if provider.is_testnet:
+        return 'testnet-explorer.peercoin.net'
+
+    return 'explorer.peercoin.net'
+
+
+def call_host(provider, method: str) -> str:
+    '''hostname <method> of the provider talks to, or it's class name if it can not be found'''
+
+    # sendrawtransaction is inherited from Provider and always uses the peercoin explorer
+    if isinstance(provider, Explorer) or method == 'sendrawtransaction':
+        return explorer_host(provider)
+
+    url = getattr(provider, 'api_url', None)
+    if isinstance(url, str) and urlparse(url).netloc:
+        return urlparse(url).netloc
+
+    return type(provider).__name__.lower()
+
+
+scheduler = Scheduler()
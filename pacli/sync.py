@@ -0,0 +1,57 @@
+import time
+
+import pypeerassets as pa
+
+from pacli.cache import TxCache
+from pacli.cards import find_cards
+from pacli.scheduler import scheduler
+
+
+def sync_deck(provider, cache: TxCache, deck_id: str, deck_version: int,
+              production: bool) -> dict:
+    '''Fetch deck spawn and cards of <deck_id> into <cache> and
+       store derived state. Transactions and blocks already cached are not
+       fetched again, so this catches up only with cards issued since the last sync.'''
+
+    previous = cache.get_state(deck_id) or {'cards': 0}
+
+    deck = pa.find_deck(provider, deck_id, deck_version, production)
+
+    if not deck:
+        raise Exception("Deck {deckid} not found.".format(deckid=deck_id))
+
+    try:
+        cards = list(find_cards(provider, deck))
+    except pa.exceptions.EmptyP2THDirectory:
+        cards = []
+
+    state = pa.protocol.DeckState(cards)
+
+    synced = {'name': deck.name,
+              'number_of_decimals': deck.number_of_decimals,
+              'cards': len(cards),
+              'last_blocknum': max((c.blocknum for c in cards), default=None),
+              'checksum': state.checksum,
+              'balances': state.balances,
+              'synced_at': int(time.time())}
+
+    cache.put_state(deck_id, synced)
+
+    return {'name': deck.name,
+            'cards': len(cards),
+            'new_cards': len(cards) - previous['cards']}
+
+
+def sync_watchlist(provider, cache: TxCache, deck_ids: list, deck_version: int,
+                   production: bool, workers: int=None) -> dict:
+    '''sync decks in <deck_ids>, at most <workers> of them at a time,
+       by default as many as the scheduler's limits allow'''
+
+    def sync(deck_id):
+
+        try:
+            return sync_deck(provider, cache, deck_id, deck_version, production)
+        except Exception as err:
+            return {'error': str(err)}
+
+    return dict(zip(deck_ids, scheduler.map(sync, deck_ids, workers)))
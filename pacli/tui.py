@@ -1,5 +1,7 @@
+import itertools
 from terminaltables import AsciiTable
 from datetime import datetime
+from typing import Iterable
 from pypeerassets import Deck, CardTransfer
 from pypeerassets.pautils import exponent_to_amount
 
@@ -19,6 +21,20 @@ def print_table(title, heading, data):
     print(table.table)
 
 
+def print_table_pages(title, heading, data, page: int=50):
+    " prints <data> as it comes in, in tables of <page> rows "
+
+    data = iter(data)
+    rows = list(itertools.islice(data, page))
+    print_table(title, heading, rows)
+
+    while True:
+        rows = list(itertools.islice(data, page))
+        if not rows:
+            break
+        print_table(None, heading, rows)
+
+
 def deck_title(deck):
     return "Deck ID: " + deck.id + " "
 
@@ -72,9 +88,9 @@ def card_line_item(card: CardTransfer):
             ]
 
 
-def print_card_list(cards: list):
+def print_card_list(cards: Iterable, deck_id: str):
 
-    print_table(
-            title="Card transfers of deck {deck}:".format(deck=cards[0].deck_id),
+    print_table_pages(
+            title="Card transfers of deck {deck}:".format(deck=deck_id),
             heading=("txid", "confirms", "seq", "sender", "receiver", "amount", "type"),
             data=map(card_line_item, cards))
@@ -4,6 +4,7 @@ from pypeerassets.transactions import (MutableTransaction,
 
 from pacli.provider import provider
 from pacli.config import Settings
+from pacli.broadcast import check_sent
 
 
 def cointoolkit_verify(hex: str) -> str:
@@ -27,6 +28,5 @@ def signtx(rawtx: MutableTransaction) -> str:
 def sendtx(signed_tx: MutableTransaction) -> str:
     '''send raw transaction'''
 
-    provider.sendrawtransaction(signed_tx.hexlify())
-
-    return signed_tx.txid
+    return check_sent(provider.sendrawtransaction(signed_tx.hexlify()),
+                      signed_tx.txid)